@@ -6,8 +6,12 @@ setup(
     package_dir={"keepa_crawler": "src"},
     packages=["keepa_crawler"],
     install_requires=[
-        'curl-cffi>=0.5.8',
+        'curl-cffi>=0.9.0',
+        'numpy>=1.17',
     ],
+    extras_require={
+        'speedups': ['deflate>=0.4', 'orjson>=3', 'msgspec>=0.18'],
+    },
     description="A client to crawl Keepa's historical Amazon product data",
     long_description=open('README.md').read(),
     long_description_content_type='text/markdown',
@@ -19,5 +23,5 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.7',
+    python_requires='>=3.8',
 )
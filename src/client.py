@@ -5,17 +5,81 @@ data.
 
 import json
 import datetime
+import inspect
 import zlib
 import os
-import struct
 import threading
+import time
 import logging
-from typing import Optional, Dict, Tuple, List, Any
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Optional, Dict, Tuple, List, Any, Union, ClassVar, Sequence, Iterable
+)
+import numpy as np
+from curl_cffi import CurlOpt
 from curl_cffi.requests import Session, WebSocket, WsCloseCode
 
+try:
+    import deflate as _libdeflate
+except ImportError:
+    _libdeflate = None
+
+try:
+    import orjson as _json
+    _dumps = _json.dumps
+except ImportError:
+    _json = json
+
+    def _dumps(obj: Any) -> bytes:
+        """Serialize ``obj`` to UTF-8 encoded JSON."""
+        return json.dumps(obj).encode()
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
 __version__ = "1.0.0"
 logger = logging.getLogger(__name__)
 
+PricePoints = List[Tuple[datetime.datetime, int]]
+RawPricePoints = Tuple[np.ndarray, np.ndarray]
+
+
+if msgspec is not None:
+    class _Product(msgspec.Struct):
+        """The fields of a Keepa product that the client reads."""
+        asin: str
+        # Left untyped so _csv_to_points validates the history exactly as
+        # for the json fallback: floats are truncated to int64, anything
+        # else non-numeric is an API error.
+        csv: Optional[List[Any]] = None
+
+    class _Envelope(msgspec.Struct):
+        """A Keepa WebSocket message; only ``products`` is decoded."""
+        products: Optional[List[_Product]] = None
+
+    _decode_envelope = msgspec.json.Decoder(_Envelope).decode
+else:
+    _decode_envelope = None
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    """Mark ``arr`` as read-only and return it."""
+    arr.flags.writeable = False
+    return arr
+
+
+def _split_template(template: Dict[str, Any], key: str) -> Tuple[bytes, bytes]:
+    """Serialize ``template`` with ``key`` appended and return the JSON bytes
+    before and after that key's value."""
+    placeholder = "\0"
+    prefix, suffix = json.dumps({**template, key: placeholder}).split(
+        json.dumps(placeholder)
+    )
+    return prefix.encode(), suffix.encode()
+
 
 class KeepaError(Exception):
     """Base exception for all Keepa client errors."""
@@ -43,6 +107,11 @@ class KeepaClient:
             connection. Defaults to a predefined Firefox user agent.
         reconnect_interval (int): Seconds to wait between reconnection attempts
             Defaults to 5.
+        decode_workers (int): Number of threads decompressing and parsing
+            incoming messages. Defaults to 4.
+        recv_buffer_size (int): libcurl receive buffer size in bytes, so large
+            product messages arrive in fewer reads. Defaults to 128 KiB,
+            the most curl_cffi hands to Python per fragment.
 
     Raises:
         KeepaConnectionError: If initial connection to the WebSocket fails.
@@ -55,7 +124,19 @@ class KeepaClient:
         'Firefox/134.0'
     )
     KEEPA_EPOCH = datetime.datetime(2011, 1, 1).timestamp()
+    KEEPA_EPOCH_NP = np.datetime64(int(KEEPA_EPOCH), 's')
     RECONNECT_INTERVAL = 5
+    # Requests are ~200 bytes of JSON; higher levels only cost CPU here.
+    COMPRESSION_LEVEL = 1
+    # Experimental: emit requests as a stored (uncompressed) DEFLATE block
+    # spliced from the precomputed template instead of running zlib.
+    STORED_REQUESTS = False
+    # libdeflate cannot grow its output buffer while decompressing, so each
+    # frame gets a bound of its size times the largest compression ratio
+    # seen so far, kept between these limits.
+    DECOMPRESSION_RATIO = 8
+    MIN_DECOMPRESSED_SIZE = 64 * 1024
+    MAX_DECOMPRESSED_SIZE = 256 * 1024 * 1024
 
     TYPES = [
         "AMAZON", "NEW", "USED", "SALES", "LISTPRICE", "COLLECTIBLE",
@@ -69,7 +150,13 @@ class KeepaClient:
         "REFURBISHED_SHIPPING", "EBAY_NEW_SHIPPING", "EBAY_USED_SHIPPING",
         "TRADE_IN", "RENT", "BUY_BOX_USED_SHIPPING", "PRIME_EXCL"
     ]
-    INDEX_TO_TYPE = {i: t for i, t in enumerate(TYPES)}
+    INDEX_TO_TYPE = tuple(TYPES)
+    # Shared by every result, so read-only.
+    _EMPTY_POINTS: RawPricePoints = (
+        _read_only(np.empty(0, dtype='datetime64[s]')),
+        _read_only(np.empty(0, dtype=np.int64))
+    )
+    _EMPTY_PRICE_TEMPLATE = dict.fromkeys(TYPES, _EMPTY_POINTS)
 
     GET_PRODUCT_TEMPLATE = {
         "path": "product",
@@ -83,24 +170,87 @@ class KeepaClient:
         "id": 3407,
         "version": "20250108"
     }
+    _PREFIX_BYTES, _SUFFIX_BYTES = _split_template(
+        GET_PRODUCT_TEMPLATE, "asin"
+    )
+    _PREFIX_ADLER = zlib.adler32(_PREFIX_BYTES)
+
+    _shared: ClassVar[Optional["KeepaClient"]] = None
+    _shared_kwargs: ClassVar[Dict[str, Any]] = {}
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
 
     def __init__(
         self,
         user_agent: Optional[str] = None,
-        reconnect_interval: int = 5
+        reconnect_interval: int = 5,
+        decode_workers: int = 4,
+        recv_buffer_size: int = 128 * 1024
     ):
         self.user_agent = user_agent or self.USER_AGENT
         self.reconnect_interval = reconnect_interval
+        self.recv_buffer_size = recv_buffer_size
 
         self.session = Session()
         self.ws: Optional[WebSocket] = None
-        self.products: Dict[str, dict] = {}
-        self.pending_events: Dict[str, Dict[str, Any]] = {}
-        self._lock = threading.Lock()
+        # One condition variable guards the outstanding requests and their
+        # results, which are either price data or the exception to raise.
+        self._cv = threading.Condition()
+        self._pending: Dict[str, int] = {}
+        self._results: Dict[str, Union[dict, Exception]] = {}
         self._ws_thread: Optional[threading.Thread] = None
         self._running = threading.Event()
+        self._stopped = threading.Event()
+        self._decompression_ratio = self.DECOMPRESSION_RATIO
+        self._stored_requests = (
+            self.STORED_REQUESTS and self._check_stored_requests()
+        )
+        # Frames are decoded off the WebSocket thread so it keeps reading.
+        self._decode_pool = ThreadPoolExecutor(
+            max_workers=decode_workers,
+            thread_name_prefix="KeepaDecodeThread"
+        )
         self._connect()
 
+    @classmethod
+    def get_shared(cls, **kwargs: Any) -> "KeepaClient":
+        """
+        Return a process-wide client, creating it on first use.
+
+        Requests from any number of threads are multiplexed over the shared
+        client's single session, WebSocket and listener thread, and routed
+        back to their callers by ASIN.
+
+        Args:
+            **kwargs: Passed to the constructor when the shared client is
+                (re)created. Must match the existing client's arguments
+                otherwise.
+
+        Raises:
+            KeepaConnectionError: If the connection fails.
+            ValueError: If ``kwargs`` conflict with the existing client.
+        """
+        signature = inspect.signature(cls)
+        arguments = signature.bind(**kwargs).arguments
+
+        with cls._shared_lock:
+            if cls._shared is None or not cls._shared._running.is_set():
+                bound = signature.bind(**kwargs)
+                bound.apply_defaults()
+                cls._shared = cls(**kwargs)
+                cls._shared_kwargs = dict(bound.arguments)
+                return cls._shared
+
+            conflicts = sorted(
+                name for name, value in arguments.items()
+                if cls._shared_kwargs.get(name) != value
+            )
+            if conflicts:
+                raise ValueError(
+                    "Shared client already exists with different arguments: "
+                    + ", ".join(conflicts)
+                )
+            return cls._shared
+
     def _connect(self) -> None:
         """Establish WebSocket connection and start background thread."""
         if self._ws_thread and self._ws_thread.is_alive():
@@ -120,6 +270,7 @@ class KeepaClient:
                 on_error=self._on_error,
                 on_close=self._on_close,
                 default_headers=True,
+                curl_options={CurlOpt.BUFFERSIZE: self.recv_buffer_size},
             )
         except Exception as e:
             logger.error("Initial connection failed: %s", e)
@@ -148,17 +299,20 @@ class KeepaClient:
                     "Attempting reconnection in %d seconds...",
                     self.reconnect_interval
                 )
-                threading.Event().wait(self.reconnect_interval)
+                if self._stopped.wait(self.reconnect_interval):
+                    break
                 self._reconnect()
 
     def _reconnect(self) -> None:
         """Handle reconnection by resetting state and establishing new
         connection."""
-        with self._lock:
-            self.products.clear()
-            for pending_entry in self.pending_events.values():
-                pending_entry['event'].set()
-            self.pending_events.clear()
+        with self._cv:
+            self._results.clear()
+            for asin in self._pending:
+                self._results[asin] = KeepaConnectionError(
+                    f"Connection lost before response for ASIN: {asin}"
+                )
+            self._cv.notify_all()
 
         try:
             if self.ws:
@@ -174,6 +328,11 @@ class KeepaClient:
     def close(self) -> None:
         """Cleanly shutdown the client and release resources."""
         self._running.clear()
+        self._stopped.set()
+
+        with self._shared_lock:
+            if type(self)._shared is self:
+                type(self)._shared = None
 
         try:
             if self.ws:
@@ -186,6 +345,8 @@ class KeepaClient:
             if self._ws_thread.is_alive():
                 logger.warning("WebSocket thread did not terminate cleanly")
 
+        self._decode_pool.shutdown(wait=False)
+
         try:
             self.session.close()
         except Exception as e:
@@ -196,114 +357,272 @@ class KeepaClient:
     def get_historical_prices(
         self,
         asin: str,
-        timeout: Optional[float] = 30
-    ) -> Dict[str, List[Tuple[datetime.datetime, int]]]:
+        timeout: Optional[float] = 30,
+        raw: bool = False
+    ) -> Union[Dict[str, PricePoints], Dict[str, RawPricePoints]]:
         """
         Retrieve historical price data for a given ASIN.
 
+        Concurrent calls for the same ASIN share a single request and its
+        response.
+
         Args:
             asin: The Amazon Standard Identification Number.
             timeout: Maximum wait time in seconds. Defaults to 30.
+            raw: Return NumPy arrays instead of Python objects. Defaults to
+                False.
 
         Returns:
-            Dictionary mapping price types to historical data points.
+            Dictionary mapping price types to historical data points. With
+            ``raw=True`` each value is a ``(timestamps, prices)`` tuple of
+            read-only ``datetime64[s]`` and ``int64`` arrays.
 
         Raises:
             KeepaConnectionError: If not connected.
-            ValueError: If duplicate request.
             KeepaTimeoutError: On response timeout.
             KeepaAPIError: On invalid data.
         """
-        if not self._running.is_set() or not self.ws:
-            raise KeepaConnectionError("Not connected to WebSocket server")
+        self._check_connected()
+        compressed_msg = self._encode_request(asin)
+        if self._register(asin):
+            self._send(asin, compressed_msg)
+
+        if not self._wait(asin, timeout):
+            raise KeepaTimeoutError(
+                f"No response for ASIN: {asin} within {timeout}s"
+            )
+
+        return self._collect(asin, raw)
+
+    def get_many(
+        self,
+        asins: Iterable[str],
+        timeout: Optional[float] = 30,
+        raw: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Retrieve historical price data for several ASINs at once.
+
+        All requests are sent before waiting for any response, so the batch
+        takes roughly one round trip instead of one per ASIN.
+
+        Args:
+            asins: The Amazon Standard Identification Numbers. Duplicates are
+                requested once.
+            timeout: Maximum wait time in seconds for the whole batch.
+                Defaults to 30.
+            raw: Return NumPy arrays instead of Python objects. Defaults to
+                False.
 
-        message = self.GET_PRODUCT_TEMPLATE.copy()
-        message['asin'] = asin
-        compressed_msg = self._compress(json.dumps(message))
+        Returns:
+            Dictionary mapping each ASIN to its price data, as returned by
+            :meth:`get_historical_prices`, or to the exception that request
+            raised.
+
+        Raises:
+            KeepaConnectionError: If not connected.
+        """
+        self._check_connected()
+        unique = list(dict.fromkeys(asins))
+        results: Dict[str, Any] = {}
+        waiting: List[str] = []
 
-        with self._lock:
-            if asin in self.pending_events:
-                raise ValueError(f"Request already pending for ASIN: {asin}")
+        try:
+            for asin in unique:
+                compressed_msg = self._encode_request(asin)
+                send = self._register(asin)
+                waiting.append(asin)
+                if send:
+                    try:
+                        self._send(asin, compressed_msg)
+                    except KeepaConnectionError as e:
+                        results[asin] = e
+
+            deadline = (
+                None if timeout is None else time.monotonic() + timeout
+            )
+            for asin in waiting:
+                if asin in results:
+                    continue
+                remaining = (
+                    None if deadline is None
+                    else max(deadline - time.monotonic(), 0)
+                )
+                if not self._wait(asin, remaining):
+                    results[asin] = KeepaTimeoutError(
+                        f"No response for ASIN: {asin} within {timeout}s"
+                    )
+                    continue
+                try:
+                    results[asin] = self._collect(asin, raw)
+                except KeepaError as e:
+                    results[asin] = e
+        finally:
+            # Never leave requests pending if the loop is interrupted.
+            for asin in waiting:
+                if asin not in results:
+                    self._release(asin)
+
+        return {asin: results[asin] for asin in unique}
+
+    def _check_connected(self) -> None:
+        """Raise if the WebSocket is not available for requests."""
+        if not self._running.is_set() or not self.ws:
+            raise KeepaConnectionError("Not connected to WebSocket server")
 
-            event = threading.Event()
-            self.pending_events[asin] = {'event': event, 'error': None}
+    def _register(self, asin: str) -> bool:
+        """Add a waiter for ``asin``; return True if a request must be sent,
+        False if one is already pending."""
+        with self._cv:
+            waiters = self._pending.get(asin, 0)
+            self._pending[asin] = waiters + 1
+            return waiters == 0
 
+    def _send(self, asin: str, compressed_msg: bytes) -> None:
+        """Send the encoded product request for a registered ``asin``."""
         try:
             self.ws.send(compressed_msg)
-            logger.debug("Sent request for ASIN: %s", asin)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Sent request for ASIN: %s", asin)
         except Exception as e:
-            with self._lock:
-                del self.pending_events[asin]
-            raise KeepaConnectionError("Failed to send request") from e
-
-        if not event.wait(timeout=timeout):
-            with self._lock:
-                if asin in self.pending_events:
-                    del self.pending_events[asin]
-            raise KeepaTimeoutError(
-                f"No response for ASIN: {asin} within {timeout}s"
-            )
+            error = KeepaConnectionError("Failed to send request")
+            error.__cause__ = e
+            with self._cv:
+                # Fail the other waiters sharing this request too.
+                self._results[asin] = error
+                self._cv.notify_all()
+                self._release(asin)
+            raise error
+
+    def _wait(self, asin: str, timeout: Optional[float]) -> bool:
+        """Wait for the response to ``asin``; forget the request on
+        timeout."""
+        with self._cv:
+            if self._cv.wait_for(lambda: asin in self._results, timeout):
+                return True
+            self._release(asin)
+            return False
+
+    def _release(self, asin: str) -> None:
+        """Remove a waiter for ``asin``, dropping the request and any
+        response once the last waiter is gone."""
+        with self._cv:
+            waiters = self._pending.get(asin, 0) - 1
+            if waiters > 0:
+                self._pending[asin] = waiters
+                return
+            self._pending.pop(asin, None)
+            self._results.pop(asin, None)
 
-        with self._lock:
-            pending_entry = self.pending_events.pop(asin, None)
-            product_data = self.products.pop(asin, None)
+    def _collect(
+        self,
+        asin: str,
+        raw: bool
+    ) -> Union[Dict[str, PricePoints], Dict[str, RawPricePoints]]:
+        """Take the response for a completed request."""
+        with self._cv:
+            product_data = self._results.get(asin)
+            self._release(asin)
 
-        if pending_entry and pending_entry['error'] is not None:
-            raise pending_entry['error']  # type: ignore
+        if isinstance(product_data, Exception):
+            raise product_data
 
         if not product_data:
             raise KeepaAPIError(
                 f"Empty product data received for ASIN: {asin}"
             )
 
-        return product_data
+        if raw:
+            # Each waiter gets its own dict around the shared arrays.
+            return dict(product_data)
+
+        return {
+            price_type: list(zip(timestamps.tolist(), prices.tolist()))
+            for price_type, (timestamps, prices) in product_data.items()
+        }
 
     def _on_message(self, ws: WebSocket, message: bytes) -> None:
-        """Handle incoming WebSocket messages."""
+        """Hand incoming WebSocket messages to the decode pool."""
+        try:
+            self._decode_pool.submit(self._process_frame, message)
+        except RuntimeError:
+            logger.debug("Dropped message received after shutdown")
+
+    def _process_frame(self, message: bytes) -> None:
+        """Decode an incoming WebSocket message and deliver its product."""
         try:
             decompressed = self._decompress(message)
-            data = json.loads(decompressed)
 
-            if 'products' not in data:
-                logger.debug("Received message without products: %s", data)
+            # Skip parsing frames that cannot contain products at all.
+            if b'"products"' not in decompressed:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Received message without products: %s",
+                                 decompressed)
+                return
+
+            product = self._parse_product(decompressed)
+
+            if product is None:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Received message without products: %s",
+                                 decompressed)
                 return
 
-            product = data['products'][0]
-            asin = product['asin']
-            price_data = {}
+            asin, csv = product
+            # A missing or empty history is reported as an API error when
+            # collected.
+            price_data = self._EMPTY_PRICE_TEMPLATE.copy() if csv else {}
             error = None
 
             try:
-                for i, csv_entry in enumerate(product['csv']):
-                    price_type = self.INDEX_TO_TYPE[i]
-                    if product['csv'][i] is None:
-                        price_data[price_type] = []
-                    else:
-                        price_data[price_type] = [
-                            (self.keepa_to_datetime(ts), price)
-                            for ts, price in zip(
-                                csv_entry[::2],
-                                csv_entry[1::2]
-                            )
-                        ]
+                index_to_type = self.INDEX_TO_TYPE
+                for i, csv_entry in enumerate(csv or ()):
+                    price_type = index_to_type[i]
+                    if csv_entry is not None:
+                        price_data[price_type] = self._csv_to_points(csv_entry)
             except Exception as e:
-                error = e
+                error = KeepaAPIError(
+                    f"Invalid CSV data received for ASIN: {asin}"
+                )
+                error.__cause__ = e
                 logger.error("Error processing CSV data for ASIN %s: %s",
                              asin, e)
 
-            with self._lock:
-                if asin in self.pending_events:
-                    pending_entry = self.pending_events[asin]
-                    if error:
-                        pending_entry['error'] = error
-                    else:
-                        self.products[asin] = price_data
-                    pending_entry['event'].set()
-                    logger.info("Received data for ASIN: %s", asin)
+            with self._cv:
+                delivered = asin in self._pending
+                if delivered:
+                    self._results[asin] = error or price_data
+                    self._cv.notify_all()
+
+            if delivered and logger.isEnabledFor(logging.INFO):
+                logger.info("Received data for ASIN: %s", asin)
 
         except Exception as e:
             logger.error("Message processing error: %s", e)
 
+    @staticmethod
+    def _parse_product(
+        data: bytes
+    ) -> Optional[Tuple[str, Optional[List[Optional[List[Any]]]]]]:
+        """Return the ASIN and CSV history of the first product in a message,
+        or None if it has no products."""
+        if _decode_envelope is not None:
+            try:
+                products = _decode_envelope(data).products
+            except msgspec.ValidationError:
+                # Leave frames off the schema to the json path below.
+                pass
+            else:
+                if not products:
+                    return None
+                return products[0].asin, products[0].csv
+
+        products = _json.loads(data).get('products')
+        if not products:
+            return None
+        product = products[0]
+        return product['asin'], product.get('csv')
+
     def _on_error(self, ws: WebSocket, error: Exception) -> None:
         """Handle WebSocket errors."""
         logger.error("WebSocket error: %s", error)
@@ -325,25 +644,114 @@ class KeepaClient:
     @staticmethod
     def generate_token() -> str:
         """Generate a random WebSocket token."""
-        random_bytes = os.urandom(32)
-        numbers = struct.unpack('16H', random_bytes)
-        return ''.join(f"{n:04x}" for n in numbers)
+        return os.urandom(32).hex()
 
     @classmethod
     def keepa_to_datetime(
         cls,
         keepa_timestamp_minutes: int
     ) -> datetime.datetime:
-        """Convert Keepa timestamp (minutes since epoch) to datetime."""
+        """Convert Keepa timestamp (minutes since epoch) to datetime.
+
+        Deprecated: price data is converted in bulk; use
+        ``get_historical_prices(..., raw=True)`` for NumPy timestamps.
+        """
+        warnings.warn(
+            "keepa_to_datetime is deprecated and will be removed in a future "
+            "release",
+            DeprecationWarning,
+            stacklevel=2
+        )
         timestamp = (keepa_timestamp_minutes * 60) + cls.KEEPA_EPOCH
         return datetime.datetime.utcfromtimestamp(timestamp)
 
-    @staticmethod
-    def _compress(message: str) -> bytes:
-        """Compress message using zlib."""
-        return zlib.compress(message.encode(), level=zlib.Z_BEST_COMPRESSION)
+    @classmethod
+    def _csv_to_points(cls, csv_entry: Sequence[int]) -> RawPricePoints:
+        """Split a flat Keepa ``[ts, price, ts, price, ...]`` list into
+        timestamp and price arrays."""
+        arr = np.asarray(csv_entry, dtype=np.int64)
+        pairs = arr[:len(arr) // 2 * 2].reshape(-1, 2)
+        timestamps = cls.KEEPA_EPOCH_NP + pairs[:, 0].astype('timedelta64[m]')
+        # Results may be shared by several waiters for the same ASIN.
+        return _read_only(timestamps), _read_only(pairs[:, 1])
+
+    def _encode_request(self, asin: str) -> bytes:
+        """Build the compressed product request for ``asin``."""
+        asin_json = _dumps(asin)
+        if self._stored_requests:
+            stored = self._stored_request(asin_json)
+            if stored is not None:
+                return stored
+        return self._compress(
+            self._PREFIX_BYTES + asin_json + self._SUFFIX_BYTES
+        )
 
-    @staticmethod
-    def _decompress(data: bytes) -> str:
-        """Decompress zlib-compressed data."""
-        return zlib.decompress(data, wbits=-zlib.MAX_WBITS).decode()
+    @classmethod
+    def _stored_request(cls, asin_json: bytes) -> Optional[bytes]:
+        """Build a zlib stream holding the request as one stored DEFLATE
+        block, or None if it is too long for a single block."""
+        length = (
+            len(cls._PREFIX_BYTES) + len(asin_json) + len(cls._SUFFIX_BYTES)
+        )
+        if length > 0xFFFF:
+            return None
+
+        checksum = zlib.adler32(
+            cls._SUFFIX_BYTES, zlib.adler32(asin_json, cls._PREFIX_ADLER)
+        )
+        return b''.join((
+            b'\x78\x01',  # zlib header: deflate, 32K window, no dictionary
+            b'\x01',  # final block, stored
+            length.to_bytes(2, 'little'),
+            (length ^ 0xFFFF).to_bytes(2, 'little'),
+            cls._PREFIX_BYTES,
+            asin_json,
+            cls._SUFFIX_BYTES,
+            checksum.to_bytes(4, 'big'),
+        ))
+
+    @classmethod
+    def _check_stored_requests(cls) -> bool:
+        """Verify stored requests decode to the same payload as the generic
+        path."""
+        asin_json = _dumps("B000000000")
+        expected = cls._PREFIX_BYTES + asin_json + cls._SUFFIX_BYTES
+        try:
+            stored = cls._stored_request(asin_json)
+            ok = stored is not None and zlib.decompress(stored) == expected
+        except zlib.error:
+            ok = False
+        if not ok:
+            logger.warning("Stored requests failed verification; disabled")
+        return ok
+
+    @classmethod
+    def _compress(cls, message: bytes) -> bytes:
+        """Compress message using zlib."""
+        return zlib.compress(message, level=cls.COMPRESSION_LEVEL)
+
+    def _decompress(self, data: bytes) -> bytes:
+        """Decompress raw DEFLATE data, using libdeflate when available."""
+        if _libdeflate is not None:
+            size = min(
+                max(
+                    len(data) * self._decompression_ratio,
+                    self.MIN_DECOMPRESSED_SIZE
+                ),
+                self.MAX_DECOMPRESSED_SIZE
+            )
+            while size <= self.MAX_DECOMPRESSED_SIZE:
+                try:
+                    result = _libdeflate.deflate_decompress(data, size)
+                except _libdeflate.DeflateError:
+                    # Either the output bound was too small or the data is
+                    # corrupt; grow the bound and let zlib report the latter.
+                    size *= 2
+                    continue
+                if data:
+                    self._decompression_ratio = max(
+                        self._decompression_ratio,
+                        -(-len(result) // len(data))
+                    )
+                return result
+        return zlib.decompress(data, wbits=-zlib.MAX_WBITS)
@@ -0,0 +1,20 @@
+"""
+Make the ``src`` directory importable as ``keepa_crawler`` when the package
+is not installed.
+"""
+
+import importlib.util
+import pathlib
+import sys
+
+SRC = pathlib.Path(__file__).resolve().parent.parent / "src"
+
+if importlib.util.find_spec("keepa_crawler") is None:
+    spec = importlib.util.spec_from_file_location(
+        "keepa_crawler",
+        SRC / "__init__.py",
+        submodule_search_locations=[str(SRC)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["keepa_crawler"] = module
+    spec.loader.exec_module(module)
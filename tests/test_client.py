@@ -0,0 +1,265 @@
+"""
+Tests for KeepaClient request bookkeeping, using an in-process WebSocket.
+"""
+
+import datetime
+import json
+import threading
+import zlib
+
+import pytest
+
+from keepa_crawler import KeepaClient, KeepaAPIError, KeepaTimeoutError
+from keepa_crawler import client as client_module
+
+
+def _deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class FakeWebSocket:
+    """Answers each request with the CSV registered for its ASIN."""
+
+    def __init__(self, client: KeepaClient):
+        self.client = client
+        self.replies = {}
+        self.sent = []
+        self.delay = 0.0
+
+    def send(self, message: bytes) -> None:
+        asin = json.loads(zlib.decompress(message))["asin"]
+        self.sent.append(asin)
+        if asin not in self.replies:
+            return
+        frame = json.dumps(
+            {"products": [{"asin": asin, "csv": self.replies[asin]}]}
+        ).encode()
+        threading.Timer(
+            self.delay, self.client._on_message, (self, _deflate(frame))
+        ).start()
+
+    def close(self) -> None:
+        pass
+
+
+def _fake_connect(self):
+    self.ws = FakeWebSocket(self)
+    self._running.set()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(KeepaClient, "_connect", _fake_connect)
+    keepa = KeepaClient()
+    yield keepa
+    keepa.close()
+
+
+@pytest.fixture
+def stored_client(monkeypatch):
+    monkeypatch.setattr(KeepaClient, "STORED_REQUESTS", True)
+    monkeypatch.setattr(KeepaClient, "_connect", _fake_connect)
+    keepa = KeepaClient()
+    yield keepa
+    keepa.close()
+
+
+def test_get_historical_prices(client):
+    client.ws.replies["A"] = [None, [1, 100, 2, 200]]
+
+    result = client.get_historical_prices("A", timeout=5)
+
+    assert result["AMAZON"] == []
+    assert [price for _, price in result["NEW"]] == [100, 200]
+    epoch = KeepaClient.KEEPA_EPOCH_NP.tolist()
+    assert result["NEW"][0][0] == epoch + datetime.timedelta(minutes=1)
+
+
+def test_get_many_invalid_csv_does_not_leak_pending(client):
+    too_many_types = [[1, 1]] * (len(KeepaClient.TYPES) + 6)
+    client.ws.replies["BAD"] = too_many_types
+    client.ws.replies["GOOD"] = [None, [1, 100]]
+
+    results = client.get_many(["BAD", "GOOD", "LATE"], timeout=0.5)
+
+    assert isinstance(results["BAD"], KeepaAPIError)
+    assert [price for _, price in results["GOOD"]["NEW"]] == [100]
+    assert isinstance(results["LATE"], KeepaTimeoutError)
+    assert not client._pending
+    assert not client._results
+
+    client.get_historical_prices("GOOD", timeout=5)
+
+
+def test_get_many_accepts_generator(client):
+    client.ws.replies["A"] = [None, [1, 100]]
+    client.ws.replies["B"] = [None, [2, 200]]
+
+    results = client.get_many((asin for asin in ["A", "B", "A"]), timeout=5)
+
+    assert list(results) == ["A", "B"]
+    assert [price for _, price in results["B"]["NEW"]] == [200]
+
+
+def test_get_many_encode_error_does_not_leak_pending(client):
+    with pytest.raises(TypeError):
+        client.get_many(["A", object()], timeout=0.5)
+
+    assert not client._pending
+    assert not client._results
+
+
+def test_concurrent_requests_for_same_asin_share_one_request(client):
+    client.ws.replies["A"] = [None, [1, 100]]
+    client.ws.delay = 0.2
+    start = threading.Barrier(4)
+    results = []
+
+    def request():
+        start.wait()
+        results.append(client.get_historical_prices("A", timeout=5))
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 4
+    assert all([p for _, p in r["NEW"]] == [100] for r in results)
+    assert client.ws.sent == ["A"]
+    assert not client._pending
+    assert not client._results
+
+
+def test_shared_raw_results_are_separate_dicts(client):
+    client.ws.replies["A"] = [None, [1, 100]]
+    client.ws.delay = 0.2
+    start = threading.Barrier(2)
+    results = []
+
+    def request():
+        start.wait()
+        results.append(client.get_historical_prices("A", timeout=5, raw=True))
+
+    threads = [threading.Thread(target=request) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.ws.sent == ["A"]
+    first, second = results
+    assert first is not second
+    first.pop("NEW")
+    assert second["NEW"][1].tolist() == [100]
+
+
+def _parse_outcome(frame):
+    try:
+        product = KeepaClient._parse_product(json.dumps(frame).encode())
+    except Exception as e:
+        return type(e)
+    if product is None:
+        return None
+    asin, csv = product
+    try:
+        points = [KeepaClient._csv_to_points(entry) for entry in csv or ()
+                  if entry is not None]
+    except Exception:
+        return asin, KeepaAPIError
+    return asin, [prices.tolist() for _, prices in points]
+
+
+@pytest.mark.parametrize("frame", [
+    {"products": [{"asin": "A", "csv": [None, [1, 100]]}]},
+    {"products": [{"asin": "A", "csv": [None, [1, 2.5]]}]},
+    {"products": [{"asin": "A", "csv": [None, [1, "x"]]}]},
+    {"products": [{"asin": "A", "csv": [None, 5]}]},
+    {"products": [{"asin": "A", "csv": None}]},
+    {"products": [{"asin": "A"}]},
+    {"products": [{"asin": 5, "csv": [None, [1, 100]]}]},
+    {"products": None},
+    {"products": []},
+])
+def test_msgspec_and_json_decoders_agree(monkeypatch, frame):
+    pytest.importorskip("msgspec")
+
+    with_msgspec = _parse_outcome(frame)
+    monkeypatch.setattr(client_module, "_decode_envelope", None)
+
+    assert with_msgspec == _parse_outcome(frame)
+
+
+@pytest.mark.parametrize("decoder", ["msgspec", "json"])
+def test_non_numeric_csv_is_api_error(client, monkeypatch, decoder):
+    if decoder == "msgspec":
+        pytest.importorskip("msgspec")
+    else:
+        monkeypatch.setattr(client_module, "_decode_envelope", None)
+    client.ws.replies["A"] = [None, [1, "x"]]
+
+    with pytest.raises(KeepaAPIError):
+        client.get_historical_prices("A", timeout=5)
+
+
+@pytest.mark.parametrize("asin", ["B000000000", "B0\u00e9\u6f22\u5b57"])
+def test_stored_request_decodes_to_template(stored_client, asin):
+    assert stored_client._stored_requests
+    message = stored_client._encode_request(asin)
+
+    assert message[2] == 0x01  # final stored block
+    assert json.loads(zlib.decompress(message)) == {
+        **KeepaClient.GET_PRODUCT_TEMPLATE, "asin": asin
+    }
+
+    stored_client.ws.replies[asin] = [None, [1, 100]]
+    result = stored_client.get_historical_prices(asin, timeout=5)
+    assert [price for _, price in result["NEW"]] == [100]
+
+
+def test_long_stored_request_falls_back_to_zlib(stored_client):
+    asin = "B" * (64 * 1024)
+
+    assert KeepaClient._stored_request(client_module._dumps(asin)) is None
+    message = stored_client._encode_request(asin)
+    assert json.loads(zlib.decompress(message))["asin"] == asin
+
+
+def test_decompress_doubles_too_small_bound(client, monkeypatch):
+    libdeflate = pytest.importorskip("deflate")
+    decompress = libdeflate.deflate_decompress
+    sizes = []
+
+    def record(data, size):
+        sizes.append(size)
+        return decompress(data, size)
+
+    monkeypatch.setattr(libdeflate, "deflate_decompress", record)
+    client.MIN_DECOMPRESSED_SIZE = 16
+    client._decompression_ratio = 1
+    payload = b"a" * 100000
+    frame = _deflate(payload)
+
+    assert client._decompress(frame) == payload
+    assert sizes[0] == len(frame)
+    assert len(sizes) > 1
+    assert all(b == 2 * a for a, b in zip(sizes, sizes[1:]))
+    assert client._decompression_ratio >= len(payload) // len(frame)
+
+
+def test_decompress_corrupt_frame_raises_zlib_error(client):
+    with pytest.raises(zlib.error):
+        client._decompress(b"\xff\xff\xff\xff")
+
+
+def test_get_shared_rejects_conflicting_arguments(client):
+    shared = KeepaClient.get_shared(reconnect_interval=7)
+    try:
+        assert KeepaClient.get_shared() is shared
+        assert KeepaClient.get_shared(reconnect_interval=7) is shared
+        with pytest.raises(ValueError):
+            KeepaClient.get_shared(reconnect_interval=1)
+    finally:
+        shared.close()